@@ -0,0 +1,26 @@
+"""Shared fixtures for the pytest port of the EchoChat API tests.
+
+Run with `pytest -n auto --dist=loadgroup` (pytest-xdist) to shard tests
+across workers; everything touching the shared room carries
+xdist_group('room') so it stays on a single worker.
+"""
+import pytest
+
+from backend_test import EchoChatAPITester
+
+@pytest.fixture(scope='session')
+def client():
+    """One authenticated tester (pooled session + token) for the whole session"""
+    tester = EchoChatAPITester()
+
+    if not tester.check_cached_token() and not tester.test_user_registration():
+        pytest.fail(f"Could not authenticate against {tester.base_url}")
+
+    return tester
+
+@pytest.fixture(scope='session')
+def room_id(client):
+    """Create the shared test room once per session"""
+    if not client.test_create_room():
+        pytest.fail("Room creation failed")
+    return client.room_id
@@ -0,0 +1,36 @@
+"""Pytest port of the EchoChat API tests.
+
+The hand-rolled runner in backend_test.py still works standalone; these
+functions reuse its client through the session-scoped fixtures in
+conftest.py, so registration and login happen once per session and pytest
+takes over ordering, reporting and parallelism.
+"""
+import pytest
+
+def test_user_login(client):
+    assert client.test_user_login()
+
+def test_invalid_login(client):
+    assert client.test_invalid_login()
+
+def test_unauthorized_access(client):
+    assert client.test_unauthorized_access()
+
+def test_list_rooms(client):
+    assert client.test_list_rooms()
+
+@pytest.mark.xdist_group('room')
+def test_get_room_details(client, room_id):
+    assert client.test_get_room_details()
+
+@pytest.mark.xdist_group('room')
+def test_check_membership(client, room_id):
+    assert client.test_check_membership()
+
+@pytest.mark.xdist_group('room')
+def test_get_messages(client, room_id):
+    assert client.test_get_messages()
+
+@pytest.mark.xdist_group('room')
+def test_pending_requests(client, room_id):
+    assert client.test_pending_requests()